@@ -0,0 +1,61 @@
+"""
+Signal layout and bipolar kernel for the emotions pipeline
+SIGNAL_CHANNELS and SIGNAL_DTYPE are shared with neuro_controller
+The kernel is compiled with Numba when it is installed, plain NumPy otherwise
+"""
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Order of the channels in signal arrays and signal messages
+SIGNAL_CHANNELS = ('O1', 'O2', 'T3', 'T4')
+
+# Layout of the signal arrays passed to the signal callback and emotions controller
+SIGNAL_DTYPE = np.dtype([(channel, np.float32) for channel in SIGNAL_CHANNELS])
+
+HAS_NUMBA = False
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError as e:
+    logger.info("numba not available (%s). Using NumPy bipolar kernel.", e)
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def bipolar_pack(t3, o1, t4, o2):
+        """
+        Compute left (T3 - O1) and right (T4 - O2) bipolar channels
+        
+        Returns:
+            Array of shape (2, N) with the left channel in row 0 and the right in row 1
+        """
+        n = t3.shape[0]
+        out = np.empty((2, n), dtype=np.float64)
+        for i in range(n):
+            out[0, i] = t3[i] - o1[i]
+            out[1, i] = t4[i] - o2[i]
+        return out
+    
+    # Compile (or load from the on-disk cache) at import, so the first batch
+    # from the sensor thread does not wait for the JIT. The channels come in
+    # as field views of a SIGNAL_DTYPE array.
+    _warmup = np.zeros(2, dtype=SIGNAL_DTYPE)
+    bipolar_pack(_warmup['T3'], _warmup['O1'], _warmup['T4'], _warmup['O2'])
+    del _warmup
+else:
+    def bipolar_pack(t3, o1, t4, o2):
+        """
+        Compute left (T3 - O1) and right (T4 - O2) bipolar channels
+        
+        Returns:
+            Array of shape (2, N) with the left channel in row 0 and the right in row 1
+        """
+        out = np.empty((2, len(t3)), dtype=np.float64)
+        np.subtract(t3, o1, out=out[0])
+        np.subtract(t4, o2, out=out[1])
+        return out
@@ -3,7 +3,12 @@ Emotions Controller for calculating relaxation/tension metrics
 Based on the PyQt BrainBitDemo emotions implementation
 """
 import logging
-from typing import Callable, Optional, Dict, Any
+from operator import attrgetter
+from typing import Callable, Optional, Dict, Any, List
+
+import numpy as np
+
+from bipolar_kernel import bipolar_pack
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +25,7 @@ try:
     from em_st_artifacts.utils.support_classes import RawChannels
     HAS_EMOTIONS = True
 except (ImportError, OSError) as e:
-    logger.warning(f"em_st_artifacts not available ({e}). Using mock emotions for development.")
+    logger.warning("em_st_artifacts not available (%s). Using mock emotions for development.", e)
     HAS_EMOTIONS = False
     
     # Mock classes for development without emotions library
@@ -32,9 +37,18 @@ except (ImportError, OSError) as e:
     ARTIFACT_BOTH_SIDES_PROBABILITY = 0.01
     ARTIFACT_SEQUENCE_PROBABILITY = 0.005
     
+    # Number of artifact flags generated at once by mock_artifact_flags
+    ARTIFACT_FLAGS_BATCH_SIZE = 4096
+    
     # Calibration settings
     MOCK_CALIBRATION_DURATION_SECONDS = 6
     
+    def mock_artifact_flags(probability):
+        """Endless stream of random artifact flags, generated in batches"""
+        rng = np.random.default_rng()
+        while True:
+            yield from (rng.random(ARTIFACT_FLAGS_BATCH_SIZE) < probability).tolist()
+    
     class MockMentalData:
         def __init__(self):
             # Generate realistic relaxation/attention values (0.0 to 1.0)
@@ -48,7 +62,9 @@ except (ImportError, OSError) as e:
             self._calibration_progress = 0
             self._calibration_finished_flag = False
             self._is_calibrating = False
-            self._start_time = None
+            self._start_ns = None
+            self._both_sides_artifacts = mock_artifact_flags(ARTIFACT_BOTH_SIDES_PROBABILITY)
+            self._sequence_artifacts = mock_artifact_flags(ARTIFACT_SEQUENCE_PROBABILITY)
         
         def set_calibration_length(self, length): pass
         def set_mental_estimation_mode(self, mode): pass
@@ -60,19 +76,22 @@ except (ImportError, OSError) as e:
             self._is_calibrating = True
             self._calibration_finished_flag = False
             self._calibration_progress = 0
-            self._start_time = time.time()
+            self._start_ns = time.monotonic_ns()
         
         def push_bipolars(self, data): pass
         
         def process_data_arr(self):
             # Simulate calibration progress
             if self._is_calibrating:
-                elapsed = time.time() - self._start_time
+                elapsed_ns = time.monotonic_ns() - self._start_ns
                 # Calibration duration from constant
-                self._calibration_progress = min(100, int((elapsed / MOCK_CALIBRATION_DURATION_SECONDS) * 100))
-                if self._calibration_progress >= 100:
+                percent = elapsed_ns * 100 // (MOCK_CALIBRATION_DURATION_SECONDS * 1_000_000_000)
+                if percent >= 100:
+                    self._calibration_progress = 100
                     self._calibration_finished_flag = True
                     self._is_calibrating = False
+                else:
+                    self._calibration_progress = percent
         
         def calibration_finished(self):
             return self._calibration_finished_flag
@@ -82,11 +101,11 @@ except (ImportError, OSError) as e:
         
         def is_both_sides_artifacted(self):
             # Randomly simulate artifacts using defined probability
-            return random.random() < ARTIFACT_BOTH_SIDES_PROBABILITY
+            return next(self._both_sides_artifacts)
         
         def is_artifacted_sequence(self):
             # Rarely simulate artifact sequences using defined probability
-            return random.random() < ARTIFACT_SEQUENCE_PROBABILITY
+            return next(self._sequence_artifacts)
         
         def read_mental_data_arr(self):
             # Return mock mental data after calibration
@@ -97,9 +116,9 @@ except (ImportError, OSError) as e:
     EmotionalMath = MockEmotionalMath
     
     class MockRawChannels:
-        def __init__(self, left, right):
-            self.left = left
-            self.right = right
+        def __init__(self, left_bipolar, right_bipolar):
+            self.left_bipolar = left_bipolar
+            self.right_bipolar = right_bipolar
     
     MathLibSetting = lambda **kwargs: None
     ArtifactDetectSetting = lambda **kwargs: None
@@ -107,10 +126,24 @@ except (ImportError, OSError) as e:
     RawChannels = MockRawChannels
 
 
+# Mental data attributes sent with emotions results
+MENTAL_DATA_FIELDS = ('rel_relaxation', 'rel_attention', 'inst_relaxation', 'inst_attention')
+_get_mental_data = attrgetter(*MENTAL_DATA_FIELDS)
+
+# Maximum number of RawChannels objects kept for reuse between batches
+RAW_CHANNELS_POOL_SIZE = 2048
+
+
 class EmotionsController:
     """
     Controller for emotions/relaxation calculations using bipolar mode
     Calculates relaxation and attention metrics from EEG data
+    
+    Signal data is passed to process_data(t3, o1, t4, o2), one 1-D array with
+    one value per sample for each channel. process_data is an instance
+    attribute bound by _select_process_data to the variant matching the
+    current calibration and callback state: _skip_data, _process_calibrating
+    or _process_streaming.
     """
     
     def __init__(self):
@@ -163,10 +196,16 @@ class EmotionsController:
         self.emotions_callback: Optional[Callable] = None
         self.calibration_callback: Optional[Callable] = None
         self._is_calibrating = False
+        
+        # RawChannels objects reused for every batch pushed to the library
+        self._raw_channels_pool: List = []
+        
+        self._is_available = self._math is not None
+        self._select_process_data()
     
     def is_available(self) -> bool:
         """Check if emotions library is available"""
-        return self._math is not None
+        return self._is_available
     
     def start_calibration(self):
         """Start emotions calibration process"""
@@ -175,79 +214,129 @@ class EmotionsController:
         
         self._math.start_calibration()
         self._is_calibrating = True
+        self._select_process_data()
         logger.info("Started emotions calibration")
     
-    def process_data(self, signal_data):
-        """
-        Process signal data and calculate emotions/relaxation metrics
-        
-        Args:
-            signal_data: List of signal samples with O1, O2, T3, T4 values
-        """
-        if not self.is_available():
-            return
-        
-        # Convert to bipolar channels (left and right)
-        # Left: T3 - O1, Right: T4 - O2
-        raw_channels = []
-        for sample in signal_data:
-            left_bipolar = sample.get('T3', 0) - sample.get('O1', 0)
-            right_bipolar = sample.get('T4', 0) - sample.get('O2', 0)
-            raw_channels.append(RawChannels(left_bipolar, right_bipolar))
-        
+    def _select_process_data(self):
+        """Bind process_data to the variant matching the current state"""
+        if not self._is_available:
+            self.process_data = self._skip_data
+        elif self._is_calibrating:
+            self.process_data = self._process_calibrating
+        elif self.emotions_callback is not None:
+            self.process_data = self._process_streaming
+        else:
+            # Nothing would consume the results
+            self.process_data = self._skip_data
+    
+    def _skip_data(self, t3, o1, t4, o2):
+        """process_data variant used when there is nothing to calculate"""
+    
+    def _process_calibrating(self, t3, o1, t4, o2):
+        """process_data variant used while calibration is in progress"""
         try:
-            # Push data and process
-            self._math.push_bipolars(raw_channels)
-            self._math.process_data_arr()
+            is_both_sides_artifacted, is_sequence_artifacted = self._push_data(t3, o1, t4, o2)
             
-            # Check artifacts
-            is_both_sides_artifacted = self._math.is_both_sides_artifacted()
-            is_sequence_artifacted = self._math.is_artifacted_sequence()
-            
-            # Check calibration status
-            if self._is_calibrating and not self._math.calibration_finished():
-                calibration_percent = self._math.get_calibration_percents()
+            if not self._math.calibration_finished():
                 if self.calibration_callback:
                     # Only include artifact flags if they are actually True to avoid confusing users
-                    callback_data = {'calibration_percent': calibration_percent}
+                    callback_data = {'calibration_percent': self._math.get_calibration_percents()}
                     if is_both_sides_artifacted:
                         callback_data['is_both_sides_artifacted'] = True
                     if is_sequence_artifacted:
                         callback_data['is_sequence_artifacted'] = True
                     self.calibration_callback(callback_data)
-            elif self._math.calibration_finished():
-                if self._is_calibrating:
-                    self._is_calibrating = False
-                    logger.info("Calibration finished")
-                
-                # Read mental data (relaxation/attention)
-                mental_data = self._math.read_mental_data_arr()
-                if len(mental_data) > 0 and self.emotions_callback:
-                    # Get the latest mental data
-                    data = mental_data[-1]
-                    # Safely extract attributes with fallback values
-                    emotions_result = {
-                        'rel_relaxation': round(getattr(data, 'rel_relaxation', 0.0), 2),
-                        'rel_attention': round(getattr(data, 'rel_attention', 0.0), 2),
-                        'inst_relaxation': round(getattr(data, 'inst_relaxation', 0.0), 2),
-                        'inst_attention': round(getattr(data, 'inst_attention', 0.0), 2),
-                        'is_both_sides_artifacted': is_both_sides_artifacted,
-                        'is_sequence_artifacted': is_sequence_artifacted
-                    }
-                    self.emotions_callback(emotions_result)
+                return
+            
+            self._is_calibrating = False
+            self._select_process_data()
+            logger.info("Calibration finished")
+            self._send_emotions(is_both_sides_artifacted, is_sequence_artifacted)
         
         except Exception as e:
-            logger.error(f"Error processing emotions data: {e}")
+            logger.error("Error processing emotions data: %s", e)
+    
+    def _process_streaming(self, t3, o1, t4, o2):
+        """process_data variant used outside calibration while emotions are requested"""
+        try:
+            is_both_sides_artifacted, is_sequence_artifacted = self._push_data(t3, o1, t4, o2)
+            if self._math.calibration_finished():
+                self._send_emotions(is_both_sides_artifacted, is_sequence_artifacted)
+        
+        except Exception as e:
+            logger.error("Error processing emotions data: %s", e)
+    
+    def _push_data(self, t3, o1, t4, o2):
+        """
+        Push a batch of signal data to the library and process it
+        
+        Returns:
+            (is_both_sides_artifacted, is_sequence_artifacted) flags
+        """
+        # Convert to bipolar channels (left and right)
+        # Left: T3 - O1, Right: T4 - O2
+        left, right = bipolar_pack(t3, o1, t4, o2)
+        raw_channels = self._fill_raw_channels(left.tolist(), right.tolist())
+        
+        # Push data and process
+        self._math.push_bipolars(raw_channels)
+        self._math.process_data_arr()
+        
+        # Check artifacts
+        return self._math.is_both_sides_artifacted(), self._math.is_artifacted_sequence()
+    
+    def _send_emotions(self, is_both_sides_artifacted, is_sequence_artifacted):
+        """Read the latest mental data (relaxation/attention) and pass it to the emotions callback"""
+        mental_data = self._math.read_mental_data_arr()
+        if len(mental_data) > 0 and self.emotions_callback:
+            # Get the latest mental data
+            data = mental_data[-1]
+            # Extract all attributes at once, fall back to default
+            # values only if some of them are missing
+            try:
+                values = _get_mental_data(data)
+            except AttributeError:
+                values = [getattr(data, name, 0.0) for name in MENTAL_DATA_FIELDS]
+            rel_relaxation, rel_attention, inst_relaxation, inst_attention = (
+                round(value, 2) for value in values
+            )
+            emotions_result = {
+                'rel_relaxation': rel_relaxation,
+                'rel_attention': rel_attention,
+                'inst_relaxation': inst_relaxation,
+                'inst_attention': inst_attention,
+                'is_both_sides_artifacted': is_both_sides_artifacted,
+                'is_sequence_artifacted': is_sequence_artifacted
+            }
+            self.emotions_callback(emotions_result)
+    
+    def _fill_raw_channels(self, left: List[float], right: List[float]) -> List:
+        """Write bipolar values into pooled RawChannels objects"""
+        n = len(left)
+        if n > RAW_CHANNELS_POOL_SIZE:
+            return [RawChannels(l, r) for l, r in zip(left, right)]
+        
+        pool = self._raw_channels_pool
+        while len(pool) < n:
+            pool.append(RawChannels(0.0, 0.0))
+        
+        for raw, l, r in zip(pool, left, right):
+            raw.left_bipolar = l
+            raw.right_bipolar = r
+        return pool[:n]
     
     def set_emotions_callback(self, callback: Callable):
         """Set callback for emotions data"""
         self.emotions_callback = callback
+        self._select_process_data()
     
     def set_calibration_callback(self, callback: Callable):
         """Set callback for calibration progress"""
         self.calibration_callback = callback
+        self._select_process_data()
     
     def clear_callbacks(self):
         """Clear all callbacks"""
         self.emotions_callback = None
         self.calibration_callback = None
+        self._select_process_data()
@@ -5,19 +5,35 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
 from contextlib import asynccontextmanager
-import asyncio
-import json
+import os
+import time
 from datetime import datetime
+import orjson
 
-from neuro_controller import NeuroController, ConnectionManager
+from neuro_controller import NeuroController, ConnectionManager, MessageOutbox
+
+# Interval in seconds over which websocket messages are collected before
+# being sent, so that several signal batches go out as one frame
+WS_FLUSH_INTERVAL = 0.04
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
     # Startup
+    # Device data is broadcast to all websocket clients. The callbacks are
+    # called from neurosdk threads and only queue the message
+    outbox.start()
+    neuro_controller.set_callbacks(
+        signal_callback=lambda data: outbox.put("signal", data),
+        resist_callback=lambda data: outbox.put("resist", data),
+        status_callback=lambda data: outbox.put("status", data),
+        emotions_callback=lambda data: outbox.put("emotions", data)
+    )
     yield
     # Shutdown
+    neuro_controller.clear_callbacks()
+    await outbox.stop()
     neuro_controller.disconnect_sensor()
 
 
@@ -29,19 +45,29 @@ app = FastAPI(
 )
 
 # CORS middleware to allow frontend connections
-# IMPORTANT: In production, replace allow_origins=["*"] with specific frontend URLs
-# Example: allow_origins=["https://yourfrontend.com", "https://app.yourfrontend.com"]
+# Origins are configured with the CORS_ORIGINS environment variable as a
+# comma-separated list, e.g. CORS_ORIGINS="https://yourfrontend.com,https://app.yourfrontend.com"
+# Browsers cache preflight responses for CORS_MAX_AGE seconds
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000").split(",")
+    if origin.strip()
+]
+CORS_MAX_AGE = 86400
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # TODO: Configure with specific origins in production
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type"],
+    max_age=CORS_MAX_AGE,
 )
 
 # Global controller and connection manager
 neuro_controller = NeuroController()
 connection_manager = ConnectionManager()
+outbox = MessageOutbox(connection_manager, WS_FLUSH_INTERVAL)
 
 
 @app.get("/")
@@ -61,13 +87,23 @@ async def root():
     }
 
 
+# Formatted status timestamp, refreshed at most every STATUS_TIMESTAMP_RESOLUTION
+# seconds: [monotonic time of last refresh, ISO timestamp]
+STATUS_TIMESTAMP_RESOLUTION = 0.1
+_status_timestamp = [float('-inf'), ""]
+
+
 @app.get("/api/status")
 async def get_status():
     """Get current connection status"""
+    now = time.monotonic()
+    if now - _status_timestamp[0] > STATUS_TIMESTAMP_RESOLUTION:
+        _status_timestamp[:] = [now, datetime.now().isoformat()]
+    
     return {
         "connected": neuro_controller.is_connected(),
         "sensor_info": neuro_controller.get_sensor_info(),
-        "timestamp": datetime.now().isoformat()
+        "timestamp": _status_timestamp[1]
     }
 
 
@@ -123,11 +159,11 @@ async def start_data_stream(data_type: str):
     """
     try:
         if data_type == "signal":
-            neuro_controller.start_signal()
+            await neuro_controller.start_signal()
         elif data_type == "resist":
-            neuro_controller.start_resist()
+            await neuro_controller.start_resist()
         elif data_type == "emotions":
-            neuro_controller.start_emotions()
+            await neuro_controller.start_emotions()
         else:
             raise HTTPException(status_code=400, detail=f"Unknown data type: {data_type}")
         
@@ -146,11 +182,11 @@ async def stop_data_stream(data_type: str):
     """
     try:
         if data_type == "signal":
-            neuro_controller.stop_signal()
+            await neuro_controller.stop_signal()
         elif data_type == "resist":
-            neuro_controller.stop_resist()
+            await neuro_controller.stop_resist()
         elif data_type == "emotions":
-            neuro_controller.stop_emotions()
+            await neuro_controller.stop_emotions()
         else:
             raise HTTPException(status_code=400, detail=f"Unknown data type: {data_type}")
         
@@ -170,70 +206,32 @@ async def websocket_endpoint(websocket: WebSocket):
     """
     await connection_manager.connect(websocket)
     
-    # Get the running event loop for this coroutine
-    loop = asyncio.get_running_loop()
-    
-    # Set up callbacks to send data through websocket
-    # These callbacks are called from neurosdk threads, so we need to use
-    # run_coroutine_threadsafe to schedule them in the main event loop
-    def send_signal(data):
-        asyncio.run_coroutine_threadsafe(
-            connection_manager.send_personal(
-                {"type": "signal", "data": data},
-                websocket
-            ),
-            loop
-        )
-    
-    def send_resist(data):
-        asyncio.run_coroutine_threadsafe(
-            connection_manager.send_personal(
-                {"type": "resist", "data": data},
-                websocket
-            ),
-            loop
-        )
-    
-    def send_status(data):
-        asyncio.run_coroutine_threadsafe(
-            connection_manager.send_personal(
-                {"type": "status", "data": data},
-                websocket
-            ),
-            loop
-        )
-    
-    def send_emotions(data):
-        asyncio.run_coroutine_threadsafe(
-            connection_manager.send_personal(
-                {"type": "emotions", "data": data},
-                websocket
-            ),
-            loop
-        )
-    
-    neuro_controller.set_callbacks(
-        signal_callback=send_signal,
-        resist_callback=send_resist,
-        status_callback=send_status,
-        emotions_callback=send_emotions
-    )
-    
     try:
         while True:
             # Keep connection alive and handle client messages
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = orjson.loads(data)
             
             # Handle different message types from client
             if message.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                await connection_manager.send_personal({"type": "pong"}, websocket)
             
     except WebSocketDisconnect:
+        pass
+    finally:
         connection_manager.disconnect(websocket)
-        neuro_controller.clear_callbacks()
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop and httptools are installed with uvicorn[standard], uvloop is not
+    # available on Windows. The sensor connection and websocket clients live in
+    # this process, so the server always runs a single worker
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
+    )
@@ -4,17 +4,32 @@ Manages BrainBit device connection and data streaming
 Based on the PyQt BrainBitDemo implementation
 """
 from typing import List, Optional, Callable, Dict, Any
-from threading import Thread
 import asyncio
 import logging
+import queue
+import threading
+from operator import attrgetter
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+import orjson
 from fastapi import WebSocket
 
+from bipolar_kernel import SIGNAL_CHANNELS, SIGNAL_DTYPE
 from emotions_controller import EmotionsController
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fetches all channels from a signal sample or resist data in one call
+_get_signal_channels = attrgetter(*SIGNAL_CHANNELS)
+
+# Largest magnitude of a quantized signal value sent to clients
+SIGNAL_QUANTIZATION_MAX = np.iinfo(np.int16).max
+
+# Messages kept per WebSocket client before the oldest ones are dropped
+WS_SEND_QUEUE_SIZE = 32
+
 try:
     from neurosdk.scanner import Scanner
     from neurosdk.sensor import Sensor
@@ -24,6 +39,7 @@ except (ImportError, OSError) as e:
     # Mock classes for development without hardware
     import random
     import time
+    from collections import namedtuple
     from threading import Thread, Event
     
     class MockSensorInfo:
@@ -32,15 +48,8 @@ except (ImportError, OSError) as e:
             self.Address = f"00:11:22:33:44:{index:02d}"
             self.SerialNumber = f"MB{1000 + index}"
     
-    class MockSignalData:
-        def __init__(self):
-            # Generate realistic EEG-like signal data (microvolts range)
-            base = random.uniform(-50, 50)
-            noise = random.uniform(-20, 20)
-            self.O1 = base + noise + random.uniform(-10, 10)
-            self.O2 = base + noise + random.uniform(-10, 10)
-            self.T3 = base + noise + random.uniform(-10, 10)
-            self.T4 = base + noise + random.uniform(-10, 10)
+    # Signal sample with the same channel attributes as neurosdk's
+    MockSignalData = namedtuple('MockSignalData', SIGNAL_CHANNELS)
     
     class MockResistData:
         def __init__(self):
@@ -93,12 +102,21 @@ except (ImportError, OSError) as e:
         
         def _generate_signal_data(self):
             # Simulate 250 Hz sampling rate with batches of 25 samples
+            rng = np.random.default_rng()
+            # Batches are paced against a monotonic schedule so time spent in
+            # the callback does not lower the effective sample rate
+            next_tick = time.monotonic()
             while not self._stop_signal.is_set():
                 if self.signalDataReceived:
-                    # Generate a batch of 25 samples (typical for BrainBit)
-                    batch = [MockSignalData() for _ in range(25)]
+                    # Generate a batch of 25 samples (typical for BrainBit) of
+                    # realistic EEG-like signal data (microvolts range): base
+                    # and noise shared by all channels plus per-channel jitter
+                    common = rng.uniform(-50, 50, size=(25, 1)) + rng.uniform(-20, 20, size=(25, 1))
+                    values = common + rng.uniform(-10, 10, size=(25, len(SIGNAL_CHANNELS)))
+                    batch = list(map(MockSignalData._make, values.tolist()))
                     self.signalDataReceived(self, batch)
-                time.sleep(0.1)  # 100ms delay between batches
+                next_tick += 0.1  # 100ms between batches
+                time.sleep(max(0, next_tick - time.monotonic()))
         
         def _start_resist_stream(self):
             if self._resist_thread and self._resist_thread.is_alive():
@@ -115,11 +133,13 @@ except (ImportError, OSError) as e:
         
         def _generate_resist_data(self):
             # Resistance updates every second
+            next_tick = time.monotonic()
             while not self._stop_resist.is_set():
                 if self.resistDataReceived:
                     data = MockResistData()
                     self.resistDataReceived(self, data)
-                time.sleep(1.0)
+                next_tick += 1.0
+                time.sleep(max(0, next_tick - time.monotonic()))
         
         def disconnect(self):
             self._stop_signal_stream()
@@ -164,6 +184,10 @@ except (ImportError, OSError) as e:
         LECallibri = "callibri"
 
 
+# State of a connected sensor, looked up once for is_connected
+SENSOR_STATE_IN_RANGE = SensorState.StateInRange
+
+
 class NeuroController:
     """Controller for BrainBit neurointerface device"""
     
@@ -171,6 +195,7 @@ class NeuroController:
         self._sensor: Optional[Sensor] = None
         self._scanner = Scanner([SensorFamily.LEBrainBit, SensorFamily.LECallibri])
         self._sensors_list: List = []
+        self._scan_lock = asyncio.Lock()
         self._signal_callback: Optional[Callable] = None
         self._resist_callback: Optional[Callable] = None
         self._status_callback: Optional[Callable] = None
@@ -181,7 +206,7 @@ class NeuroController:
     
     def is_connected(self) -> bool:
         """Check if sensor is connected"""
-        return self._sensor is not None and hasattr(self._sensor, 'state') and self._sensor.state == SensorState.StateInRange
+        return self._sensor is not None and self._sensor.state == SENSOR_STATE_IN_RANGE
     
     def get_sensor_info(self) -> Optional[Dict[str, Any]]:
         """Get information about connected sensor"""
@@ -210,40 +235,40 @@ class NeuroController:
         Returns:
             List of found sensors with their info
         """
-        self._sensors_list = []
-        found_sensors = []
-        
-        def sensors_found(scanner, sensors):
-            self._sensors_list = sensors
-        
-        self._scanner.sensorsChanged = sensors_found
-        
-        # Run scanner in thread
-        def run_scan():
+        # Only one scan runs at a time, a second request waits for the first
+        # one instead of taking over the scanner callback halfway through
+        async with self._scan_lock:
+            sensors_list = []
+            sensors_projected = []
+            
+            def sensors_found(scanner, sensors):
+                nonlocal sensors_list, sensors_projected
+                # Project the sensors as they arrive so the scan just returns the list
+                sensors_projected = [
+                    {
+                        "index": i,
+                        "name": sensor.Name,
+                        "address": sensor.Address,
+                        "serial_number": sensor.SerialNumber
+                    }
+                    for i, sensor in enumerate(sensors)
+                ]
+                sensors_list = sensors
+            
+            self._scanner.sensorsChanged = sensors_found
+            
+            # start() and stop() return immediately, sensors are reported through
+            # the callback while the scanner runs
             self._scanner.start()
-            import time
-            time.sleep(duration)
-            self._scanner.stop()
-        
-        thread = Thread(target=run_scan)
-        thread.start()
-        thread.join()
-        
-        self._scanner.sensorsChanged = None
-        
-        # Convert sensor info to dict
-        for i, sensor in enumerate(self._sensors_list):
             try:
-                found_sensors.append({
-                    "index": i,
-                    "name": getattr(sensor, 'Name', 'Unknown'),
-                    "address": getattr(sensor, 'Address', 'Unknown'),
-                    "serial_number": getattr(sensor, 'SerialNumber', 'Unknown')
-                })
-            except Exception as e:
-                logger.error(f"Error processing sensor {i}: {e}")
-        
-        return found_sensors
+                await asyncio.sleep(duration)
+            finally:
+                self._scanner.stop()
+                self._scanner.sensorsChanged = None
+            
+            # connect_sensor keeps using the previous results until the scan is over
+            self._sensors_list = sensors_list
+            return sensors_projected
     
     async def connect_sensor(self, sensor_index: int) -> bool:
         """
@@ -302,55 +327,42 @@ class NeuroController:
             finally:
                 self._sensor = None
     
-    def start_signal(self):
+    async def start_signal(self):
         """Start signal data streaming"""
         if not self.is_connected():
             raise RuntimeError("Sensor not connected")
         
         def signal_received(sensor, signal_data):
             if self._signal_callback:
-                # Convert signal data to serializable format
-                data_list = []
-                for sample in signal_data:
-                    try:
-                        data_list.append({
-                            "O1": getattr(sample, 'O1', 0),
-                            "O2": getattr(sample, 'O2', 0),
-                            "T3": getattr(sample, 'T3', 0),
-                            "T4": getattr(sample, 'T4', 0)
-                        })
-                    except Exception as e:
-                        logger.error(f"Error processing signal sample: {e}")
+                try:
+                    samples = signal_to_array(signal_data)
+                except Exception as e:
+                    logger.error(f"Error processing signal samples: {e}")
+                    return
                 
-                self._signal_callback(data_list)
+                self._signal_callback(samples)
         
         self._sensor.signalDataReceived = signal_received
         
-        def execute_command():
-            try:
-                self._sensor.exec_command(SensorCommand.StartSignal)
-            except Exception as e:
-                logger.error(f"Error starting signal: {e}")
-        
-        thread = Thread(target=execute_command)
-        thread.start()
+        try:
+            await asyncio.to_thread(self._sensor.exec_command, SensorCommand.StartSignal)
+        except Exception as e:
+            logger.error(f"Error starting signal: {e}")
+            raise
     
-    def stop_signal(self):
+    async def stop_signal(self):
         """Stop signal data streaming"""
         if not self.is_connected():
             return
         
-        def execute_command():
-            try:
-                self._sensor.exec_command(SensorCommand.StopSignal)
-                self._sensor.signalDataReceived = None
-            except Exception as e:
-                logger.error(f"Error stopping signal: {e}")
-        
-        thread = Thread(target=execute_command)
-        thread.start()
+        try:
+            await asyncio.to_thread(self._sensor.exec_command, SensorCommand.StopSignal)
+            self._sensor.signalDataReceived = None
+        except Exception as e:
+            logger.error(f"Error stopping signal: {e}")
+            raise
     
-    def start_resist(self):
+    async def start_resist(self):
         """Start resistance data streaming"""
         if not self.is_connected():
             raise RuntimeError("Sensor not connected")
@@ -358,43 +370,32 @@ class NeuroController:
         def resist_received(sensor, resist_data):
             if self._resist_callback:
                 try:
-                    data = {
-                        "O1": getattr(resist_data, 'O1', float('inf')),
-                        "O2": getattr(resist_data, 'O2', float('inf')),
-                        "T3": getattr(resist_data, 'T3', float('inf')),
-                        "T4": getattr(resist_data, 'T4', float('inf'))
-                    }
+                    data = dict(zip(SIGNAL_CHANNELS, _get_signal_channels(resist_data)))
                     self._resist_callback(data)
                 except Exception as e:
                     logger.error(f"Error processing resist data: {e}")
         
         self._sensor.resistDataReceived = resist_received
         
-        def execute_command():
-            try:
-                self._sensor.exec_command(SensorCommand.StartResist)
-            except Exception as e:
-                logger.error(f"Error starting resist: {e}")
-        
-        thread = Thread(target=execute_command)
-        thread.start()
+        try:
+            await asyncio.to_thread(self._sensor.exec_command, SensorCommand.StartResist)
+        except Exception as e:
+            logger.error(f"Error starting resist: {e}")
+            raise
     
-    def stop_resist(self):
+    async def stop_resist(self):
         """Stop resistance data streaming"""
         if not self.is_connected():
             return
         
-        def execute_command():
-            try:
-                self._sensor.exec_command(SensorCommand.StopResist)
-                self._sensor.resistDataReceived = None
-            except Exception as e:
-                logger.error(f"Error stopping resist: {e}")
-        
-        thread = Thread(target=execute_command)
-        thread.start()
+        try:
+            await asyncio.to_thread(self._sensor.exec_command, SensorCommand.StopResist)
+            self._sensor.resistDataReceived = None
+        except Exception as e:
+            logger.error(f"Error stopping resist: {e}")
+            raise
     
-    def start_emotions(self):
+    async def start_emotions(self):
         """Start emotions/relaxation data streaming"""
         if not self.is_connected():
             raise RuntimeError("Sensor not connected")
@@ -411,51 +412,40 @@ class NeuroController:
         
         # Set up signal data processing for emotions
         def signal_received(sensor, signal_data):
-            # Convert signal data to dict format
-            data_list = []
-            for sample in signal_data:
-                try:
-                    data_list.append({
-                        "O1": getattr(sample, 'O1', 0),
-                        "O2": getattr(sample, 'O2', 0),
-                        "T3": getattr(sample, 'T3', 0),
-                        "T4": getattr(sample, 'T4', 0)
-                    })
-                except Exception as e:
-                    logger.error(f"Error processing signal sample for emotions: {e}")
+            try:
+                samples = signal_to_array(signal_data)
+            except Exception as e:
+                logger.error(f"Error processing signal samples for emotions: {e}")
+                return
             
             # Process through emotions controller
-            self._emotions_controller.process_data(data_list)
+            self._emotions_controller.process_data(
+                samples['T3'], samples['O1'], samples['T4'], samples['O2']
+            )
         
         self._sensor.signalDataReceived = signal_received
         self._is_emotions_active = True
         
-        def execute_command():
-            try:
-                self._sensor.exec_command(SensorCommand.StartSignal)
-            except Exception as e:
-                logger.error(f"Error starting emotions: {e}")
-        
-        thread = Thread(target=execute_command)
-        thread.start()
+        try:
+            await asyncio.to_thread(self._sensor.exec_command, SensorCommand.StartSignal)
+        except Exception as e:
+            logger.error(f"Error starting emotions: {e}")
+            raise
     
-    def stop_emotions(self):
+    async def stop_emotions(self):
         """Stop emotions/relaxation data streaming"""
         if not self.is_connected():
             return
         
         self._is_emotions_active = False
         
-        def execute_command():
-            try:
-                self._sensor.exec_command(SensorCommand.StopSignal)
-                self._sensor.signalDataReceived = None
-                self._emotions_controller.clear_callbacks()
-            except Exception as e:
-                logger.error(f"Error stopping emotions: {e}")
-        
-        thread = Thread(target=execute_command)
-        thread.start()
+        try:
+            await asyncio.to_thread(self._sensor.exec_command, SensorCommand.StopSignal)
+            self._sensor.signalDataReceived = None
+            self._emotions_controller.clear_callbacks()
+        except Exception as e:
+            logger.error(f"Error stopping emotions: {e}")
+            raise
     
     def _on_emotions_data(self, data):
         """Internal callback for emotions data"""
@@ -493,38 +483,181 @@ class NeuroController:
         self._emotions_callback = None
 
 
+def signal_to_array(signal_data) -> np.ndarray:
+    """Convert a batch of neurosdk signal samples to a SIGNAL_DTYPE array"""
+    return np.array(list(map(_get_signal_channels, signal_data)), dtype=SIGNAL_DTYPE)
+
+
+def pack_signal(samples: np.ndarray) -> Dict[str, Any]:
+    """
+    Quantize signal samples to int16 for sending to clients
+    
+    The scale is chosen per call so the largest value in the batch maps to
+    SIGNAL_QUANTIZATION_MAX, whatever units the device reports in.
+    
+    Args:
+        samples: SIGNAL_DTYPE array
+        
+    Returns:
+        Message data with the int16 samples and the scale to multiply them by
+    """
+    samples = structured_to_unstructured(samples)
+    # Non-finite samples are sent as 0 and do not affect the scale
+    finite = np.isfinite(samples)
+    peak = float(np.abs(samples[finite]).max()) if finite.any() else 0.0
+    scale = peak / SIGNAL_QUANTIZATION_MAX if peak > 0 else 1.0
+    samples = np.where(finite, samples, 0.0)
+    quantized = np.rint(samples / scale).astype(np.int16)
+    return {"scale": scale, "samples": quantized}
+
+
+def dumps_message(message: dict) -> str:
+    """
+    Serialize a websocket message to JSON text using orjson
+    
+    numpy arrays and scalars are serialized natively. The result is sent as
+    a text frame, which is what the frontend expects.
+    """
+    return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
 class ConnectionManager:
-    """Manages WebSocket connections"""
+    """
+    Manages WebSocket connections
+    
+    Every connection has its own bounded send queue drained by a sender task,
+    so a slow client only delays itself. When a client's queue is full the
+    oldest queued message is dropped to make room for the new one.
+    """
     
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
     
     async def connect(self, websocket: WebSocket):
         """Accept new WebSocket connection"""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        send_queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.active_connections[websocket] = send_queue
+        self._senders[websocket] = asyncio.create_task(self._send_loop(websocket, send_queue))
     
     def disconnect(self, websocket: WebSocket):
         """Remove WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.pop(websocket, None)
+        sender = self._senders.pop(websocket, None)
+        if sender is not None and sender is not asyncio.current_task():
+            sender.cancel()
     
     async def send_personal(self, message: dict, websocket: WebSocket):
         """Send message to specific client"""
         try:
-            await websocket.send_json(message)
+            await websocket.send_text(dumps_message(message))
         except Exception as e:
             logger.error(f"Error sending message: {e}")
     
-    async def broadcast(self, message: dict):
-        """Broadcast message to all connected clients"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.append(connection)
+    def broadcast(self, message: dict):
+        """Queue message for all connected clients"""
+        if not self.active_connections:
+            return
         
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+        # Serialize once for all clients
+        payload = dumps_message(message)
+        for send_queue in self.active_connections.values():
+            try:
+                send_queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                send_queue.get_nowait()
+                send_queue.put_nowait(payload)
+    
+    async def _send_loop(self, websocket: WebSocket, send_queue: asyncio.Queue):
+        try:
+            while True:
+                payload = await send_queue.get()
+                await websocket.send_text(payload)
+        except Exception as e:
+            logger.debug("Dropping client after failed send: %s", e)
+            self.disconnect(websocket)
+
+
+class MessageOutbox:
+    """
+    Collects messages from neurosdk threads and broadcasts them from the event loop
+    
+    Callbacks are called from neurosdk threads, so put() only adds the message
+    to a thread-safe queue. A single drainer task running in the event loop
+    sends everything queued; the loop is woken up once per burst of messages
+    instead of once per message.
+    """
+    
+    def __init__(self, connection_manager: ConnectionManager, flush_interval: float):
+        self._connection_manager = connection_manager
+        self._flush_interval = flush_interval
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._wakeup_pending = threading.Event()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Start the drainer task in the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._drain())
+    
+    async def stop(self):
+        """Stop the drainer task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def put(self, message_type: str, data):
+        """Queue a message for broadcasting, safe to call from any thread"""
+        if self._loop is None:
+            return
+        self._queue.put((message_type, data))
+        if not self._wakeup_pending.is_set():
+            self._wakeup_pending.set()
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+    
+    async def _drain(self):
+        while True:
+            await self._wakeup.wait()
+            # Let the rest of this tick's messages arrive before sending
+            await asyncio.sleep(self._flush_interval)
+            self._wakeup.clear()
+            self._wakeup_pending.clear()
+            
+            # Signal batches are merged into a single frame, other messages
+            # are sent as they are, in the order they were queued
+            messages = []
+            signal_message = None
+            signal_batches = []
+            while True:
+                try:
+                    message_type, data = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if message_type == "signal":
+                    if signal_message is None:
+                        signal_message = {"type": "signal"}
+                        messages.append(signal_message)
+                    signal_batches.append(data)
+                else:
+                    messages.append({"type": message_type, "data": data})
+            
+            if signal_message is not None:
+                try:
+                    signal_message["data"] = pack_signal(np.concatenate(signal_batches))
+                except Exception as e:
+                    logger.error("Error packing signal data: %s", e)
+                    messages.remove(signal_message)
+            
+            for message in messages:
+                try:
+                    self._connection_manager.broadcast(message)
+                except Exception as e:
+                    logger.error(f"Error broadcasting message: {e}")
@@ -2,7 +2,7 @@ import { useState, useEffect } from 'react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 import { ApiService } from '../services/api';
 import { wsService, MessageHandler } from '../services/websocket';
-import type { SignalData, WebSocketMessage } from '../types';
+import type { SignalData, SignalFrame, WebSocketMessage } from '../types';
 
 export function SignalViewer() {
   const [isStreaming, setIsStreaming] = useState(false);
@@ -11,11 +11,15 @@ export function SignalViewer() {
 
   useEffect(() => {
     const handler: MessageHandler = (message: WebSocketMessage) => {
-      if (message.type === 'signal' && Array.isArray(message.data)) {
+      if (message.type === 'signal') {
+        const { scale, samples } = message.data as SignalFrame;
         setSignalData(prev => {
           const now = Date.now();
-          const newData = (message.data as SignalData[]).map((sample: SignalData, index: number) => ({
-            ...sample,
+          const newData = samples.map(([O1, O2, T3, T4], index: number) => ({
+            O1: O1 * scale,
+            O2: O2 * scale,
+            T3: T3 * scale,
+            T4: T4 * scale,
             time: now + index
           }));
           
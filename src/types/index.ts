@@ -22,6 +22,13 @@ export interface SignalData {
   T4: number;
 }
 
+// Signal samples as sent over the WebSocket: each row is [O1, O2, T3, T4]
+// quantized to int16, multiply by scale to get the original values
+export interface SignalFrame {
+  scale: number;
+  samples: Array<[number, number, number, number]>;
+}
+
 export interface ResistData {
   O1: number;
   O2: number;
@@ -47,7 +54,7 @@ export interface EmotionsData {
 
 export interface WebSocketMessage {
   type: 'signal' | 'resist' | 'status' | 'emotions' | 'pong';
-  data: SignalData[] | ResistData | StatusData | EmotionsData;
+  data: SignalFrame | ResistData | StatusData | EmotionsData;
 }
 
 export interface ApiResponse<T> {
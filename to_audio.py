@@ -1,114 +1,188 @@
-import av
+import asyncio
+import ctranslate2
+import functools
 import os
-import whisper
+import shutil
+import tempfile
 import yt_dlp
 import sys
-from transformers import pipeline
-
-def download_video(url, output_filename="video.mp4"):
+from faster_whisper import WhisperModel
+from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+from transformers import AutoTokenizer
+
+# Whisper works on 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+
+# Hub model id, or a local directory with an already exported ONNX model
+SUMMARIZER_MODEL = os.environ.get("SUMMARIZER_MODEL", "sshleifer/distilbart-cnn-6-6")
+
+# Hub models are exported to ONNX and quantized to int8 on the first run,
+# the result is kept here and loaded directly afterwards
+SUMMARIZER_CACHE_DIR = os.environ.get(
+    "SUMMARIZER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "focusflow", "summarizer"),
+)
+
+def download_audio(url, output_filename="audio.wav"):
+    # Only the audio track is downloaded, ffmpeg converts it straight to
+    # the format Whisper works on
     ydl_opts = {
-        'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-        'outtmpl': output_filename,
+        'format': 'bestaudio/best',
+        'outtmpl': os.path.splitext(output_filename)[0] + '.%(ext)s',
         'overwrites': True,
         'quiet': True,
         'no_warnings': True,
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'wav',
+            'preferredquality': '0',
+        }],
+        'postprocessor_args': {
+            'extractaudio': ['-ar', str(WHISPER_SAMPLE_RATE), '-ac', '1'],
+        },
     }
     print(f"⬇️ Начинаю скачивание: {url}")
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             ydl.download([url])
-        print(f"✅ Видео скачано: {output_filename}")
+        print(f"✅ Аудио скачано: {output_filename}")
         return True
     except Exception as e:
         print(f"❌ Ошибка скачивания: {e}")
         return False
 
-def convert_video_to_audio_pyav(video_path, audio_path):
-    if not os.path.exists(video_path):
-        print(f"Файл {video_path} не найден!")
-        return False
-    try:
-        container = av.open(video_path)
-        audio_stream = next((s for s in container.streams.audio), None)
-        if audio_stream is None:
-            print("❌ В видео нет аудио дорожки")
-            return False
-        
-        output_container = av.open(audio_path, 'w')
-        output_stream = output_container.add_stream('mp3', rate=44100)
-
-        for packet in container.demux(audio_stream):
-            for frame in packet.decode():
-                frame.pts = None
-                for packet_out in output_stream.encode(frame):
-                    output_container.mux(packet_out)
-
-        for packet_out in output_stream.encode(None):
-            output_container.mux(packet_out)
-
-        output_container.close()
-        container.close()
-        print(f"✅ Аудио извлечено: {audio_path}")
-        return True
-    except Exception as e:
-        print(f"❌ Ошибка конвертации: {e}")
-        return False
+@functools.lru_cache(maxsize=None)
+def get_whisper(name="small"):
+    if ctranslate2.get_cuda_device_count() > 0:
+        return WhisperModel(name, device="cuda", compute_type="int8_float16")
+    return WhisperModel(name, device="cpu", compute_type="int8")
+
+def export_summarizer(model_name, model_dir):
+    print("⚙️ Первый запуск: экспортирую модель аннотации в ONNX и квантую в int8...")
+    quantization_config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    # Written next to model_dir and renamed at the end, so an interrupted
+    # export is never mistaken for a finished one
+    staging_dir = model_dir + ".tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    with tempfile.TemporaryDirectory() as export_dir:
+        ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True).save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+        shutil.copytree(export_dir, staging_dir, ignore=shutil.ignore_patterns("*.onnx", "*.onnx_data"))
+        for file_name in os.listdir(export_dir):
+            if file_name.endswith(".onnx"):
+                quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=file_name)
+                quantizer.quantize(quantization_config=quantization_config, save_dir=staging_dir, file_suffix=None)
+    os.replace(staging_dir, model_dir)
+
+@functools.lru_cache(maxsize=None)
+def get_summarizer():
+    print("🧠 Загружаю модель distilbart для аннотации...")
+    if os.path.isdir(SUMMARIZER_MODEL):
+        model_dir = SUMMARIZER_MODEL
+    else:
+        model_dir = os.path.join(SUMMARIZER_CACHE_DIR, SUMMARIZER_MODEL.replace("/", "--"))
+        if not os.path.isdir(model_dir):
+            os.makedirs(SUMMARIZER_CACHE_DIR, exist_ok=True)
+            export_summarizer(SUMMARIZER_MODEL, model_dir)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_dir, provider="CPUExecutionProvider")
+    return tokenizer, model
 
 def summarize_text_light(text):
     if len(text) < 100:
         return "Текст слишком короток для аннотации."
 
-    print("🧠 Загружаю модель t5-small для аннотации...")
     try:
-        summarizer = pipeline("summarization", model="t5-small")
+        tokenizer, model = get_summarizer()
         
-        input_text = "summarize: " + " ".join(text.split()[:500])
+        inputs = tokenizer(text, truncation=True, max_length=1024, return_tensors="pt")
 
         print("📝 Генерирую краткую выжимку...")
-        summary_result = summarizer(input_text, max_length=100, min_length=30, do_sample=False)
-        return summary_result[0]['summary_text']
+        summary_ids = model.generate(**inputs, max_length=100, min_length=30, do_sample=False)
+        return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
     except Exception as e:
         return f"Ошибка при создании аннотации: {e}"
 
-if name == "main":
-    if len(sys.argv) < 2:
-        print("❌ Ошибка: Укажите ссылку на видео как аргумент.")
-        print("Пример: python3 main.py \"https://www.youtube.com/watch?v=...\"")
-        sys.exit(1)
-    
-    youtube_url = sys.argv[1]
-    video_filename = "video.mp4"
-    audio_filename = "audio.mp3"
-
-    if download_video(youtube_url, video_filename):
-        if convert_video_to_audio_pyav(video_filename, audio_filename):
-            
-            print("🧠 Загружаю модель Whisper...")
-            try:
-                model = whisper.load_model("small")
-                print("📝 Начинаю транскрибацию...")
-                result = model.transcribe(audio_filename)
-                full_text = result["text"]
-
-                summary_text = summarize_text_light(full_text)
-
-                print("\n" + "="*40)
-                print("✅ ТРАНСКРИПЦИЯ ЗАВЕРШЕНА")
-                print("="*40)
-                print(f"АННОТАЦИЯ:\n{summary_text}\n")
-                print(f"ПОЛНЫЙ ТЕКСТ:\n{full_text}")
-                print("="*40)
-
-                with open("transcription.txt", "w", encoding="utf-8") as f:
-                    f.write(full_text)
-                
-                with open("summary.txt", "w", encoding="utf-8") as f:
-                    f.write(summary_text)
-
-                print(f"\n💾 Сохранено: transcription.txt и summary.txt")
-
-                os.remove(video_filename)
-                os.remove(audio_filename)
-
-            except Exception as e:
-                print(f"❌ Критическая ошибка: {e}")
+def transcribe_audio(audio_filename, index):
+    try:
+        model = get_whisper("small")
+        print(f"📝 [{index}] Начинаю транскрибацию...")
+        segments, info = model.transcribe(audio_filename, beam_size=1)
+        full_text = "".join(segment.text for segment in segments)
+
+        summary_text = summarize_text_light(full_text)
+
+        print("\n" + "="*40)
+        print(f"✅ [{index}] ТРАНСКРИПЦИЯ ЗАВЕРШЕНА")
+        print("="*40)
+        print(f"АННОТАЦИЯ:\n{summary_text}\n")
+        print(f"ПОЛНЫЙ ТЕКСТ:\n{full_text}")
+        print("="*40)
+
+        transcription_filename = f"transcription_{index}.txt"
+        summary_filename = f"summary_{index}.txt"
+
+        with open(transcription_filename, "w", encoding="utf-8") as f:
+            f.write(full_text)
+        
+        with open(summary_filename, "w", encoding="utf-8") as f:
+            f.write(summary_text)
+
+        print(f"\n💾 Сохранено: {transcription_filename} и {summary_filename}")
+
+        os.remove(audio_filename)
+
+    except Exception as e:
+        print(f"❌ Критическая ошибка: {e}")
+
+async def fetch_next(urls, index):
+    # Returns None when there are no URLs left
+    url = await asyncio.to_thread(next, urls, None)
+    if url is None:
+        return None
+    audio_filename = f"audio_{index}.wav"
+    downloaded = await asyncio.to_thread(download_audio, url, audio_filename)
+    return audio_filename, downloaded
+
+async def process_urls(urls):
+    # The next URL is downloaded while the current one is transcribed:
+    # the download waits on the network, transcription on the CPU/GPU.
+    # The first download also runs while the models load.
+    urls = iter(urls)
+    index = 1
+    pending = asyncio.create_task(fetch_next(urls, index))
+
+    # Models are loaded once and stay in memory for all URLs. A model that
+    # fails to load here is loaded again, and the error reported, when a URL
+    # needs it, so a transcript is still saved if only summarization fails.
+    print("🧠 Загружаю модель Whisper...")
+    try:
+        await asyncio.to_thread(get_whisper, "small")
+    except Exception as e:
+        print(f"❌ Ошибка загрузки модели: {e}")
+    try:
+        await asyncio.to_thread(get_summarizer)
+    except Exception as e:
+        print(f"❌ Ошибка загрузки модели: {e}")
+
+    while True:
+        item = await pending
+        if item is None:
+            break
+        audio_filename, downloaded = item
+        pending = asyncio.create_task(fetch_next(urls, index + 1))
+        if downloaded:
+            await asyncio.to_thread(transcribe_audio, audio_filename, index)
+        index += 1
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        urls = sys.argv[1:]
+    else:
+        if sys.stdin.isatty():
+            print("Укажите ссылки на видео как аргументы или по одной в строке на stdin.")
+            print("Пример: python3 to_audio.py \"https://www.youtube.com/watch?v=...\"")
+        urls = (line.strip() for line in sys.stdin if line.strip())
+
+    asyncio.run(process_urls(urls))